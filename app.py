@@ -1,39 +1,332 @@
-from flask import Flask, render_template, request, redirect, session, flash
+from flask import Flask, render_template, request, redirect, session, flash, url_for, abort, jsonify
+from jinja2 import FileSystemBytecodeCache
+import click
+import contextvars
+import csv
+import gzip
+import hashlib
+import json
 import sqlite3
 import threading
-from datetime import datetime
+import time
+from datetime import datetime, timedelta, date as dt_date
 import os
-from calendar import month_name
+from calendar import month_name, monthrange
 from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from fractions import Fraction
+from functools import total_ordering
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:  # Brotli precompression is optional; gzip is always available
+    brotli = None
 
 app = Flask(__name__)
 app.secret_key = 'supersecretkey'
 DB_NAME = 'smartspend.db'
+# Independent dashboard reads run concurrently on pooled read-only connections unless disabled,
+# e.g. SMARTSPEND_CONCURRENT_READS=0 to measure the serial baseline.
+app.config['CONCURRENT_READS'] = os.environ.get('SMARTSPEND_CONCURRENT_READS', '1') != '0'
+# Requests the server handles at once; the shared read pool is sized so each of them can fan out.
+app.config['SERVER_THREADS'] = int(os.environ.get('SMARTSPEND_SERVER_THREADS', '8'))
+app.config['READ_POOL_SIZE'] = int(os.environ.get('SMARTSPEND_READ_POOL_SIZE', str(4 * app.config['SERVER_THREADS'])))
+# Seconds a connection waits on a locked database before SQLite gives up with SQLITE_BUSY.
+app.config['DB_TIMEOUT'] = float(os.environ.get('SMARTSPEND_DB_TIMEOUT', '5'))
+# Report per-request database time and lock errors in X-DB-* response headers (used by loadtest.py).
+app.config['DB_STATS'] = os.environ.get('SMARTSPEND_DB_STATS', '0') == '1'
+# Currency every total is converted to; expenses can be recorded in any currency in ExchangeRates.
+app.config['BASE_CURRENCY'] = os.environ.get('SMARTSPEND_BASE_CURRENCY', 'USD').upper()
+# Seconds between background runs that materialize due recurring-schedule occurrences; 0 leaves it to `flask materialize`.
+app.config['MATERIALIZE_INTERVAL'] = int(os.environ.get('SMARTSPEND_MATERIALIZE_INTERVAL', '3600'))
+app.config['MATERIALIZE_BATCH_SIZE'] = int(os.environ.get('SMARTSPEND_MATERIALIZE_BATCH_SIZE', '500'))
+# Compiled templates persist here between restarts, so a cold start skips parsing them again.
+app.config['TEMPLATE_CACHE_DIR'] = os.environ.get('SMARTSPEND_TEMPLATE_CACHE_DIR', os.path.join(app.root_path, '.jinja_cache'))
+
+def template_bytecode_cache(directory):
+    """A bytecode cache in directory, or None when it can't be written (e.g. a read-only deployment)"""
+    try:
+        os.makedirs(directory, exist_ok=True)
+    except OSError:
+        return None
+    return FileSystemBytecodeCache(directory) if os.access(directory, os.W_OK) else None
+
+_bytecode_cache = template_bytecode_cache(app.config['TEMPLATE_CACHE_DIR'])
+if _bytecode_cache is not None:
+    app.jinja_options = {**app.jinja_options, 'bytecode_cache': _bytecode_cache}
+else:
+    app.logger.warning("Template cache directory %s is not writable; compiling templates in memory only",
+                       app.config['TEMPLATE_CACHE_DIR'])
+ASSET_MAX_AGE = 31536000  # one year; fingerprinted URLs change whenever the content does
+# Days of recent savings used to project when each goal will be reached.
+app.config['FORECAST_WINDOW_DAYS'] = int(os.environ.get('SMARTSPEND_FORECAST_WINDOW_DAYS', '90'))
+SCHEMA_VERSION = 5
+CURRENCY_SYMBOLS = {'USD': '$', 'AUD': 'A$', 'CAD': 'C$', 'NZD': 'NZ$', 'EUR': '€', 'GBP': '£', 'JPY': '¥', 'INR': '₹'}
+# Rates are stored as exact fractions; terms above this are rejected so conversions stay in 64-bit integers
+MAX_RATE_TERM = 10 ** 15
+MAX_AMOUNT_DIGITS = 30
+
+@total_ordering
+class Money: # Represents an exact amount of money as integer cents, so sums never drift.
+    __slots__ = ('cents', 'currency')
+
+    def __init__(self, cents=0, currency=None):
+        self.cents = int(cents or 0)
+        self.currency = currency or app.config['BASE_CURRENCY']
+
+    @classmethod
+    def parse(cls, text, currency=None):
+        """Parse a decimal string such as '12.34', rounding half up to the nearest cent"""
+        try:
+            value = Decimal(str(text).strip())
+        except InvalidOperation:
+            raise ValueError(f"Invalid amount: {text!r}")
+        if not value.is_finite():
+            raise ValueError(f"Invalid amount: {text!r}")
+        if value.adjusted() > MAX_AMOUNT_DIGITS:  # e.g. '1e999999'; anything this long is beyond every amount limit
+            raise ValueError(f"Amount out of range: {text!r}")
+        # to_integral_value, unlike quantize, is not bounded by the context precision, so '1e30' still parses
+        return cls(int(value.scaleb(2).to_integral_value(rounding=ROUND_HALF_UP)), currency)
+
+    def divide(self, parts):
+        """Split evenly into parts, rounding half up to the nearest cent"""
+        sign = -1 if self.cents < 0 else 1
+        return Money(sign * ((abs(self.cents) * 2 + parts) // (parts * 2)), self.currency)
+
+    def format(self, symbol=True):
+        sign = '-' if self.cents < 0 else ''
+        dollars, cents = divmod(abs(self.cents), 100)
+        if not symbol:
+            return f"{sign}{dollars}.{cents:02d}"
+        if self.currency in CURRENCY_SYMBOLS:
+            return f"{sign}{CURRENCY_SYMBOLS[self.currency]}{dollars:,}.{cents:02d}"
+        return f"{sign}{self.currency} {dollars:,}.{cents:02d}"
+
+    def _check_currency(self, other):
+        if self.currency != other.currency:
+            raise ValueError(f"Cannot combine {self.currency} and {other.currency} amounts")
+
+    def __str__(self):
+        return self.format()
+
+    def __repr__(self):
+        return f"Money({self.cents}, {self.currency!r})"
+
+    def __add__(self, other):
+        self._check_currency(other)
+        return Money(self.cents + other.cents, self.currency)
+
+    def __sub__(self, other):
+        self._check_currency(other)
+        return Money(self.cents - other.cents, self.currency)
+
+    def __abs__(self):
+        return Money(abs(self.cents), self.currency)
+
+    def __bool__(self):
+        return self.cents != 0
+
+    def __eq__(self, other):
+        return isinstance(other, Money) and (self.cents, self.currency) == (other.cents, other.currency)
+
+    def __lt__(self, other):
+        self._check_currency(other)
+        return self.cents < other.cents
+
+    def __hash__(self):
+        return hash((self.cents, self.currency))
+
+MAX_AMOUNT_CENTS = 100_000_000
+
+@app.template_filter('money')
+def money_filter(value, symbol=True, currency=None): # Formats a Money or a raw cents value from SQL for display.
+    if not isinstance(value, Money):
+        value = Money(value, currency)
+    return value.format(symbol)
+
+# Expenses with each amount converted to the base currency inside SQLite, so aggregates never
+# convert row by row in Python. Rates may be relative to any reference currency. base_cents is
+# NULL when the expense's currency or the base currency has no rate, so SUM() leaves such rows
+# out and UNCONVERTED_COUNT reports them. Bind the base currency code as the first parameter.
+# amount * (r_num / r_den) / (b_num / b_den), rounded half up in integer arithmetic.
+CONVERTED_EXPENSES = '''(
+    SELECT e.id, e.amount_cents, e.currency, e.date, e.description, e.category, e.timestamp,
+           CASE WHEN e.currency = base.code THEN e.amount_cents
+                ELSE CAST((e.amount_cents * r.rate_num * b.rate_den * 2 + r.rate_den * b.rate_num)
+                          / (2 * r.rate_den * b.rate_num) AS INTEGER) END AS base_cents
+    FROM Expenses e
+    CROSS JOIN (SELECT ? AS code) base
+    LEFT JOIN ExchangeRates r ON r.currency = e.currency
+    LEFT JOIN ExchangeRates b ON b.currency = base.code
+)'''
+UNCONVERTED_COUNT = f'SELECT COUNT(*) FROM {CONVERTED_EXPENSES} WHERE base_cents IS NULL'
+
+class ConvertedTotalsCache: # Caches converted period totals per (period, base currency) until expenses or rates change.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {}
+        self._generation = 0
+        self._version = None
+
+    @staticmethod
+    def data_version(db_manager):
+        """Counter that triggers bump on every change to Expenses or ExchangeRates, from any process"""
+        with db_manager.connect() as conn:
+            return conn.execute('SELECT version FROM DataVersion WHERE id = 1').fetchone()[0]
+
+    def get(self, key, version=None):
+        """Return the cached totals (or None) and a token to hand back to put().
+
+        A version other than the last one seen drops everything cached first.
+        """
+        with self._lock:
+            if version != self._version:
+                self._totals.clear()
+                self._generation += 1
+                self._version = version
+            return self._totals.get(key), self._generation
+
+    def put(self, key, totals, generation):
+        # Totals computed before an invalidation are stale, so only keep them if nothing changed since get().
+        with self._lock:
+            if generation == self._generation:
+                self._totals[key] = totals
+
+    def invalidate(self):
+        with self._lock:
+            self._totals.clear()
+            self._generation += 1
+
+totals_cache = ConvertedTotalsCache()
+
+class DbStats: # Time spent in SQLite and lock errors hit while serving one request.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.ms = 0.0
+        self.busy = 0
+
+    def add(self, ms, busy=False):
+        with self._lock:
+            self.ms += ms
+            self.busy += int(busy)
+
+_request_db_stats = contextvars.ContextVar('request_db_stats', default=None)
+
+def is_lock_error(error):
+    """True for SQLITE_BUSY / SQLITE_LOCKED, i.e. another connection held the database too long"""
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and ('locked' in message or 'busy' in message)
+
+def count_lock_error(error):
+    """True the first time a lock error passes through connect(), so nested blocks count it once"""
+    if not is_lock_error(error) or getattr(error, 'lock_counted', False):
+        return False
+    error.lock_counted = True
+    return True
 
 class DatabaseManager: # Manages database connections and operations. Uses SQLite as the data source with connection pooling.   
     _local = threading.local()
     
     def __init__(self, db_name=DB_NAME):
         self.db_name = db_name
+        self._read_pool = None
+        self._read_pool_lock = threading.Lock()
+        self._reads_in_flight = 0
         self._create_tables()
 
+    def _open(self, readonly=False):
+        if readonly:
+            # Read-only connections never take the write lock, so under WAL pooled reads never wait on a writer
+            conn = sqlite3.connect(Path(self.db_name).resolve().as_uri() + '?mode=ro', uri=True,
+                                   timeout=app.config['DB_TIMEOUT'], check_same_thread=False)
+        else:
+            conn = sqlite3.connect(self.db_name, timeout=app.config['DB_TIMEOUT'], check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+
     @contextmanager
-    def connect(self):
+    def connect(self, readonly=False):
         """Context manager for database connections with connection pooling"""
-        if not hasattr(self._local, 'connection'):
-            self._local.connection = sqlite3.connect(self.db_name, check_same_thread=False)
-            self._local.connection.row_factory = sqlite3.Row
+        attr = 'read_connection' if readonly else 'connection'
+        if not hasattr(self._local, attr):
+            setattr(self._local, attr, self._open(readonly))
+        conn = getattr(self._local, attr)
+        # Nested blocks share the thread's connection; only the outermost one is timed,
+        # but lock errors are counted wherever they happen, since callers may swallow them
+        depth = getattr(self._local, 'depth', 0)
+        self._local.depth = depth + 1
+        stats = _request_db_stats.get()
+        started = time.perf_counter()
+        busy = False
         try:
-            yield self._local.connection
-        except Exception:
-            self._local.connection.rollback()
+            yield conn
+        except Exception as e:
+            busy = count_lock_error(e)
+            conn.rollback()
             raise
         else:
-            self._local.connection.commit()
+            try:
+                conn.commit()
+            except sqlite3.OperationalError as e:
+                busy = count_lock_error(e)
+                raise
+        finally:
+            self._local.depth = depth
+            if stats is not None and (depth == 0 or busy):
+                stats.add((time.perf_counter() - started) * 1000 if depth == 0 else 0.0, busy)
+
+    def _query(self, sql, params=(), readonly=False):
+        with self.connect(readonly) as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def _read_done(self, future):
+        with self._read_pool_lock:
+            self._reads_in_flight -= 1
+
+    def _get_read_pool(self):
+        with self._read_pool_lock:
+            if self._read_pool is None:
+                self._read_pool = ThreadPoolExecutor(max_workers=app.config['READ_POOL_SIZE'],
+                                                     thread_name_prefix='smartspend-read')
+            return self._read_pool
+
+    def fetch_many(self, queries, concurrent=None):
+        """Run independent read queries and return their rows keyed by name.
+
+        queries maps a name to a (sql, params) pair. In concurrent mode each query runs on a
+        worker thread with its own read-only connection, so the wait is the slowest query rather
+        than the sum of all of them. When the pool has too few idle workers the queries run
+        serially instead, rather than queueing behind other requests' reads.
+        """
+        if concurrent is None:
+            concurrent = app.config['CONCURRENT_READS']
+        started = time.perf_counter()
+        if concurrent:
+            pool = self._get_read_pool()
+            with self._read_pool_lock:
+                concurrent = self._reads_in_flight + len(queries) <= app.config['READ_POOL_SIZE']
+                if concurrent:
+                    self._reads_in_flight += len(queries)
+        if concurrent:
+            # Each worker gets a copy of the caller's context so its database time counts towards the request
+            futures = {name: pool.submit(contextvars.copy_context().run, self._query, sql, params, True)
+                       for name, (sql, params) in queries.items()}
+            for future in futures.values():
+                future.add_done_callback(self._read_done)
+            results = {name: future.result() for name, future in futures.items()}
+        else:
+            results = {name: self._query(sql, params) for name, (sql, params) in queries.items()}
+        app.logger.debug("Fetched %d queries in %.2f ms (%s)", len(queries),
+                         (time.perf_counter() - started) * 1000, 'concurrent' if concurrent else 'serial')
+        return results
 
     def _create_tables(self):
         """Create database tables if they don't exist"""
         with self.connect() as conn:
+            # WAL lets readers and the single writer proceed without blocking each other
+            conn.execute('PRAGMA journal_mode=WAL')
             c = conn.cursor()
             c.execute('''CREATE TABLE IF NOT EXISTS Users (
                             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -42,30 +335,164 @@ class DatabaseManager: # Manages database connections and operations. Uses SQLit
                         )''')
             c.execute('''CREATE TABLE IF NOT EXISTS Income (
                             id INTEGER PRIMARY KEY AUTOINCREMENT,
-                            yearly REAL,
-                            monthly REAL,
-                            weekly REAL
+                            yearly_cents INTEGER,
+                            monthly_cents INTEGER,
+                            weekly_cents INTEGER
                         )''')
             c.execute('''CREATE TABLE IF NOT EXISTS Expenses (
                             id INTEGER PRIMARY KEY AUTOINCREMENT,
-                            amount REAL,
+                            amount_cents INTEGER,
                             date TEXT,
                             description TEXT,
                             category TEXT,
-                            timestamp TEXT
+                            timestamp TEXT,
+                            currency TEXT,
+                            schedule_id INTEGER
                         )''')
             c.execute('''CREATE TABLE IF NOT EXISTS Goals (
                             id INTEGER PRIMARY KEY AUTOINCREMENT,
                             name TEXT,
-                            target_amount REAL,
+                            target_cents INTEGER,
                             is_active BOOLEAN,
                             created_at TEXT,
-                            updated_at TEXT
+                            updated_at TEXT,
+                            completed BOOLEAN DEFAULT 0,
+                            completed_at TEXT,
+                            saved_cents INTEGER NOT NULL DEFAULT 0
+                        )''')
+            c.execute('''CREATE TABLE IF NOT EXISTS GoalProgress (
+                            id INTEGER PRIMARY KEY AUTOINCREMENT,
+                            goal_id INTEGER NOT NULL,
+                            date TEXT NOT NULL,
+                            delta_cents INTEGER NOT NULL,
+                            saved_cents INTEGER NOT NULL,
+                            expense_id INTEGER,
+                            recorded_at TEXT
+                        )''')
+            c.execute('''CREATE TABLE IF NOT EXISTS RecurringSchedules (
+                            id INTEGER PRIMARY KEY AUTOINCREMENT,
+                            amount_cents INTEGER NOT NULL,
+                            currency TEXT NOT NULL,
+                            description TEXT,
+                            category TEXT,
+                            frequency TEXT NOT NULL,
+                            cron TEXT,
+                            start_date TEXT NOT NULL,
+                            end_date TEXT,
+                            next_date TEXT,
+                            created_at TEXT
+                        )''')
+            c.execute('''CREATE TABLE IF NOT EXISTS ExchangeRates (
+                            currency TEXT PRIMARY KEY,
+                            rate_num INTEGER NOT NULL,
+                            rate_den INTEGER NOT NULL,
+                            loaded_at TEXT
                         )''')
             # Create indexes for frequently queried columns
             c.execute('CREATE INDEX IF NOT EXISTS idx_expenses_date ON Expenses(date)')
             c.execute('CREATE INDEX IF NOT EXISTS idx_expenses_category ON Expenses(category)')
             c.execute('CREATE INDEX IF NOT EXISTS idx_goals_active ON Goals(is_active)')
+            c.execute('CREATE INDEX IF NOT EXISTS idx_schedules_next_date ON RecurringSchedules(next_date)')
+            c.execute('CREATE INDEX IF NOT EXISTS idx_goal_progress_goal ON GoalProgress(goal_id, date)')
+            c.execute('CREATE INDEX IF NOT EXISTS idx_goal_progress_expense ON GoalProgress(expense_id)')
+            self._migrate(c)
+            # One expense per schedule and day, so re-running the materializer never duplicates occurrences
+            c.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_expenses_schedule ON Expenses(schedule_id, date) WHERE schedule_id IS NOT NULL')
+            # Every write to the tables converted totals depend on bumps this counter, whichever process makes it.
+            # Created after the migrations, which may rebuild ExchangeRates (dropping its triggers).
+            c.execute('''CREATE TABLE IF NOT EXISTS DataVersion (
+                            id INTEGER PRIMARY KEY CHECK (id = 1),
+                            version INTEGER NOT NULL
+                        )''')
+            c.execute('INSERT OR IGNORE INTO DataVersion (id, version) VALUES (1, 0)')
+            for table in ('Expenses', 'ExchangeRates'):
+                for event in ('INSERT', 'UPDATE', 'DELETE'):
+                    c.execute(f'''CREATE TRIGGER IF NOT EXISTS bump_version_{table.lower()}_{event.lower()}
+                                  AFTER {event} ON {table}
+                                  BEGIN UPDATE DataVersion SET version = version + 1 WHERE id = 1; END''')
+
+    def _migrate(self, c):
+        """Upgrade an existing database to SCHEMA_VERSION, one step at a time"""
+        version = c.execute('PRAGMA user_version').fetchone()[0]
+        if version < 1:
+            self._migrate_to_cents(c)
+        if version < 2:
+            self._migrate_to_currencies(c)
+        if version < 3:
+            self._migrate_to_schedules(c)
+        if version < 5:
+            # Ahead of the goal-progress step, which converts expenses with these rates
+            self._migrate_to_rate_fractions(c)
+        if version < 4:
+            self._migrate_to_goal_progress(c)
+        c.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+    def _migrate_to_cents(self, c):
+        """Move REAL amount columns to exact integer cents columns"""
+        legacy_columns = {
+            'Income': [('yearly', 'yearly_cents'), ('monthly', 'monthly_cents'), ('weekly', 'weekly_cents')],
+            'Expenses': [('amount', 'amount_cents')],
+            'Goals': [('target_amount', 'target_cents')],
+        }
+        for table, columns in legacy_columns.items():
+            existing = {row[1] for row in c.execute(f'PRAGMA table_info({table})')}
+            for legacy, column in columns:
+                if legacy not in existing:
+                    continue
+                if column not in existing:
+                    c.execute(f'ALTER TABLE {table} ADD COLUMN {column} INTEGER')
+                c.execute(f'UPDATE {table} SET {column} = CAST(ROUND({legacy} * 100) AS INTEGER) WHERE {legacy} IS NOT NULL')
+                if sqlite3.sqlite_version_info >= (3, 35, 0):
+                    c.execute(f'ALTER TABLE {table} DROP COLUMN {legacy}')
+
+    def _migrate_to_currencies(self, c):
+        """Record a currency on every expense; existing rows are in the base currency"""
+        existing = {row[1] for row in c.execute('PRAGMA table_info(Expenses)')}
+        if 'currency' not in existing:
+            c.execute('ALTER TABLE Expenses ADD COLUMN currency TEXT')
+        c.execute('UPDATE Expenses SET currency = ? WHERE currency IS NULL', (app.config['BASE_CURRENCY'],))
+
+    def _migrate_to_schedules(self, c):
+        """Link expenses to the recurring schedule that generated them"""
+        existing = {row[1] for row in c.execute('PRAGMA table_info(Expenses)')}
+        if 'schedule_id' not in existing:
+            c.execute('ALTER TABLE Expenses ADD COLUMN schedule_id INTEGER')
+
+    def _migrate_to_rate_fractions(self, c):
+        """Replace six-digit fixed-point rates with exact numerator/denominator pairs"""
+        existing = {row[1] for row in c.execute('PRAGMA table_info(ExchangeRates)')}
+        if 'rate_micros' not in existing:
+            return
+        rows = c.execute('SELECT currency, rate_micros, loaded_at FROM ExchangeRates').fetchall()
+        c.execute('DROP TABLE ExchangeRates')
+        c.execute('''CREATE TABLE ExchangeRates (
+                        currency TEXT PRIMARY KEY,
+                        rate_num INTEGER NOT NULL,
+                        rate_den INTEGER NOT NULL,
+                        loaded_at TEXT
+                    )''')
+        rates = [(currency, Fraction(micros, 1_000_000), loaded_at) for currency, micros, loaded_at in rows]
+        c.executemany('INSERT INTO ExchangeRates (currency, rate_num, rate_den, loaded_at) VALUES (?, ?, ?, ?)',
+                      [(currency, rate.numerator, rate.denominator, loaded_at) for currency, rate, loaded_at in rates])
+
+    def _migrate_to_goal_progress(self, c):
+        """Build each goal's savings timeline once from its existing saving expenses"""
+        existing = {row[1] for row in c.execute('PRAGMA table_info(Goals)')}
+        for column, definition in [('completed', 'BOOLEAN DEFAULT 0'), ('completed_at', 'TEXT'),
+                                   ('saved_cents', 'INTEGER NOT NULL DEFAULT 0')]:
+            if column not in existing:
+                c.execute(f'ALTER TABLE Goals ADD COLUMN {column} {definition}')
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        c.execute(f'''INSERT INTO GoalProgress (goal_id, date, delta_cents, saved_cents, expense_id, recorded_at)
+                      SELECT g.id, e.date, e.base_cents,
+                             SUM(e.base_cents) OVER (PARTITION BY g.id ORDER BY e.date, e.id), e.id, ?
+                      FROM Goals g JOIN {CONVERTED_EXPENSES} e ON e.category = 'saving' AND e.description = g.name
+                      ORDER BY g.id, e.date, e.id''', (now, app.config['BASE_CURRENCY']))
+        c.execute('''UPDATE Goals SET saved_cents = COALESCE(
+                         (SELECT saved_cents FROM GoalProgress WHERE goal_id = Goals.id ORDER BY id DESC LIMIT 1), 0)''')
+        c.execute('''UPDATE Goals SET completed = 1, completed_at = COALESCE(completed_at,
+                         (SELECT MIN(date) FROM GoalProgress p WHERE p.goal_id = Goals.id AND p.saved_cents >= Goals.target_cents))
+                     WHERE target_cents > 0 AND saved_cents >= target_cents''')
 
 class User: # Represents a user of the SmartSpend app. Encapsulates user-related data and operations.
     def __init__(self, email, password):
@@ -97,14 +524,14 @@ class User: # Represents a user of the SmartSpend app. Encapsulates user-related
 class Income: # Represents income data with yearly, monthly, and weekly amounts.
     def __init__(self, yearly):
         self.yearly = yearly
-        self.monthly = round(yearly / 12, 2)
-        self.weekly = round(yearly / 52, 2)
+        self.monthly = yearly.divide(12)
+        self.weekly = yearly.divide(52)
 
     def save(self, db_manager):
         with db_manager.connect() as conn:
             c = conn.cursor()
-            c.execute('INSERT INTO Income (yearly, monthly, weekly) VALUES (?, ?, ?)',
-                      (self.yearly, self.monthly, self.weekly))
+            c.execute('INSERT INTO Income (yearly_cents, monthly_cents, weekly_cents) VALUES (?, ?, ?)',
+                      (self.yearly.cents, self.monthly.cents, self.weekly.cents))
             conn.commit()
 
     def update(self, db_manager):
@@ -113,11 +540,11 @@ class Income: # Represents income data with yearly, monthly, and weekly amounts.
             c.execute('SELECT id FROM Income ORDER BY id DESC LIMIT 1')
             row = c.fetchone()
             if row:
-                c.execute('UPDATE Income SET yearly=?, monthly=?, weekly=? WHERE id=?',
-                          (self.yearly, self.monthly, self.weekly, row[0]))
+                c.execute('UPDATE Income SET yearly_cents=?, monthly_cents=?, weekly_cents=? WHERE id=?',
+                          (self.yearly.cents, self.monthly.cents, self.weekly.cents, row[0]))
             else:
-                c.execute('INSERT INTO Income (yearly, monthly, weekly) VALUES (?, ?, ?)',
-                          (self.yearly, self.monthly, self.weekly))
+                c.execute('INSERT INTO Income (yearly_cents, monthly_cents, weekly_cents) VALUES (?, ?, ?)',
+                          (self.yearly.cents, self.monthly.cents, self.weekly.cents))
             conn.commit()
 
 class Expense: # Represents an expense entry.
@@ -131,23 +558,30 @@ class Expense: # Represents an expense entry.
     def save(self, db_manager):
         with db_manager.connect() as conn:
             c = conn.cursor()
-            c.execute('INSERT INTO Expenses (amount, date, description, category, timestamp) VALUES (?, ?, ?, ?, ?)',
-                      (self.amount, self.date, self.description, self.category, self.timestamp))
+            c.execute('INSERT INTO Expenses (amount_cents, currency, date, description, category, timestamp) VALUES (?, ?, ?, ?, ?, ?)',
+                      (self.amount.cents, self.amount.currency, self.date, self.description, self.category, self.timestamp))
+            GoalProgress.record_expenses(c, [c.lastrowid])
             conn.commit()
+        totals_cache.invalidate()
 
     def update(self, db_manager, expense_id):
         with db_manager.connect() as conn:
             c = conn.cursor()
-            c.execute('UPDATE Expenses SET amount=?, date=?, description=?, category=? WHERE id=?',
-                      (self.amount, self.date, self.description, self.category, expense_id))
+            GoalProgress.reverse_expense(c, expense_id)
+            c.execute('UPDATE Expenses SET amount_cents=?, currency=?, date=?, description=?, category=? WHERE id=?',
+                      (self.amount.cents, self.amount.currency, self.date, self.description, self.category, expense_id))
+            GoalProgress.record_expenses(c, [expense_id])
             conn.commit()
+        totals_cache.invalidate()
 
     @staticmethod
     def delete(db_manager, expense_id):
         with db_manager.connect() as conn:
             c = conn.cursor()
+            GoalProgress.reverse_expense(c, expense_id)
             c.execute('DELETE FROM Expenses WHERE id=?', (expense_id,))
             conn.commit()
+        totals_cache.invalidate()
 
 class Goal: # Represents a financial goal with a target amount and status.
     def __init__(self, name, target_amount, is_active=False, created_at=None, updated_at=None):
@@ -160,22 +594,26 @@ class Goal: # Represents a financial goal with a target amount and status.
     def save(self, db_manager):
         with db_manager.connect() as conn:
             c = conn.cursor()
-            c.execute('INSERT INTO Goals (name, target_amount, is_active, created_at) VALUES (?, ?, ?, ?)',
-                      (self.name, self.target_amount, self.is_active, self.created_at))
+            c.execute('INSERT INTO Goals (name, target_cents, is_active, created_at) VALUES (?, ?, ?, ?)',
+                      (self.name, self.target_amount.cents, self.is_active, self.created_at))
+            GoalProgress.record_unclaimed(c, c.lastrowid)
             conn.commit()
 
     def update(self, db_manager, goal_id, new_name, new_target):
         now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         with db_manager.connect() as conn:
             c = conn.cursor()
-            c.execute('UPDATE Goals SET name = ?, target_amount = ?, updated_at = ? WHERE id = ?',
-                      (new_name, new_target, now, goal_id))
+            c.execute('UPDATE Goals SET name = ?, target_cents = ?, updated_at = ? WHERE id = ?',
+                      (new_name, new_target.cents, now, goal_id))
+            GoalProgress.record_unclaimed(c, goal_id)
+            GoalProgress.update_completion(c, goal_id, now[:10])
             conn.commit()
 
     @staticmethod
     def delete(db_manager, goal_id):
         with db_manager.connect() as conn:
             c = conn.cursor()
+            c.execute('DELETE FROM GoalProgress WHERE goal_id = ?', (goal_id,))
             c.execute('DELETE FROM Goals WHERE id = ?', (goal_id,))
             conn.commit()
 
@@ -187,7 +625,557 @@ class Goal: # Represents a financial goal with a target amount and status.
             c.execute('UPDATE Goals SET is_active = 1 WHERE id = ?', (goal_id,))
             conn.commit()
 
+class GoalProgress: # Appends to each goal's cumulative savings timeline as saving expenses come and go.
+    @staticmethod
+    def record_expenses(c, expense_ids):
+        """Credit saving expenses to the goals named in their description, in the caller's transaction"""
+        if not expense_ids:
+            return
+        placeholders = ', '.join('?' * len(expense_ids))
+        c.execute(f'''SELECT g.id, e.date, e.base_cents, e.id
+                      FROM {CONVERTED_EXPENSES} e JOIN Goals g ON g.name = e.description
+                      WHERE e.category = 'saving' AND e.base_cents IS NOT NULL AND e.id IN ({placeholders})
+                      ORDER BY e.date, e.id''', (app.config['BASE_CURRENCY'], *expense_ids))
+        for goal_id, date, delta_cents, expense_id in c.fetchall():
+            GoalProgress._append(c, goal_id, date, delta_cents, expense_id)
+
+    @staticmethod
+    def record_unclaimed(c, goal_id):
+        """Credit a newly created or renamed goal with saving expenses under its name that no goal has claimed yet"""
+        c.execute('''SELECT e.id FROM Expenses e JOIN Goals g ON g.name = e.description
+                     WHERE g.id = ? AND e.category = 'saving'
+                     AND NOT EXISTS (SELECT 1 FROM GoalProgress p WHERE p.expense_id = e.id)''', (goal_id,))
+        GoalProgress.record_expenses(c, [row[0] for row in c.fetchall()])
+
+    @staticmethod
+    def revalue(c):
+        """Bring every credited expense's contribution in line with the current exchange rates.
+
+        Contributions are stored in the base currency, so after new rates are loaded each one that
+        changed gets an adjusting entry on its expense's date; goals then agree with converted totals.
+        """
+        c.execute(f'''SELECT p.goal_id, e.date, e.base_cents - SUM(p.delta_cents), e.id
+                      FROM GoalProgress p JOIN {CONVERTED_EXPENSES} e ON e.id = p.expense_id
+                      GROUP BY p.goal_id, e.id
+                      HAVING SUM(p.delta_cents) != 0 AND e.base_cents != SUM(p.delta_cents)
+                      ORDER BY e.date, e.id''', (app.config['BASE_CURRENCY'],))
+        for goal_id, date, delta_cents, expense_id in c.fetchall():
+            GoalProgress._append(c, goal_id, date, delta_cents, expense_id)
+
+    @staticmethod
+    def reverse_expense(c, expense_id):
+        """Take back whatever an expense has contributed so far, e.g. before it is edited or deleted"""
+        c.execute('''SELECT goal_id, SUM(delta_cents), MIN(date) FROM GoalProgress WHERE expense_id = ?
+                     GROUP BY goal_id HAVING SUM(delta_cents) != 0''', (expense_id,))
+        for goal_id, contributed, date in c.fetchall():
+            GoalProgress._append(c, goal_id, date, -contributed, expense_id)
+
+    @staticmethod
+    def _append(c, goal_id, date, delta_cents, expense_id):
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        c.execute('UPDATE Goals SET saved_cents = saved_cents + ? WHERE id = ?', (delta_cents, goal_id))
+        c.execute('''INSERT INTO GoalProgress (goal_id, date, delta_cents, saved_cents, expense_id, recorded_at)
+                     SELECT id, ?, ?, saved_cents, ?, ? FROM Goals WHERE id = ?''',
+                  (date, delta_cents, expense_id, now, goal_id))
+        GoalProgress.update_completion(c, goal_id, date)
+
+    @staticmethod
+    def update_completion(c, goal_id, date):
+        """Record the goal as completed on date once savings reach the target, and undo that if they drop below"""
+        c.execute('''UPDATE Goals SET completed = 1, completed_at = ?
+                     WHERE id = ? AND NOT COALESCE(completed, 0) AND target_cents > 0 AND saved_cents >= target_cents''',
+                  (date, goal_id))
+        c.execute('''UPDATE Goals SET completed = 0, completed_at = NULL
+                     WHERE id = ? AND completed AND saved_cents < target_cents''', (goal_id,))
+
+    @staticmethod
+    def forecast(c, goal_id, saved_cents, target_cents, today=None):
+        """Projected completion date at the recent daily savings rate, or None if savings aren't growing"""
+        today = today or dt_date.today()
+        c.execute('SELECT MIN(date) FROM GoalProgress WHERE goal_id = ?', (goal_id,))
+        first = c.fetchone()[0]
+        try:
+            first = dt_date.fromisoformat(first)
+        except (TypeError, ValueError):  # no progress yet, or a date stored before dates were validated
+            return None
+        window_days = min(app.config['FORECAST_WINDOW_DAYS'], max((today - first).days, 1))
+        c.execute('SELECT SUM(delta_cents) FROM GoalProgress WHERE goal_id = ? AND date >= ?',
+                  (goal_id, (today - timedelta(days=window_days)).isoformat()))
+        recent_cents = c.fetchone()[0] or 0
+        if recent_cents <= 0:
+            return None
+        days_left = -(-(target_cents - saved_cents) * window_days // recent_cents)
+        return today + timedelta(days=max(days_left, 0))
+
+    @staticmethod
+    def timeline(db_manager, goal_id):
+        """Cumulative savings per day for one goal"""
+        with db_manager.connect() as conn:
+            c = conn.cursor()
+            c.execute('SELECT date, SUM(delta_cents) FROM GoalProgress WHERE goal_id = ? GROUP BY date ORDER BY date',
+                      (goal_id,))
+            series, saved = [], 0
+            for date, delta_cents in c.fetchall():
+                saved += delta_cents
+                series.append((date, saved))
+            return series
+
+class ExchangeRate: # Represents the locally loaded exchange-rate table used to convert expenses to the base currency.
+    @staticmethod
+    def load_file(db_manager, path):
+        """Replace all rates with the currency,rate rows of a local CSV file.
+
+        Each rate is the value of one unit of that currency in a common reference currency,
+        so any reference works as long as the file is consistent.
+        """
+        loaded_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        rates = []
+        with open(path, newline='') as f:
+            for row in csv.reader(f):
+                if not row or row[0].strip().startswith('#') or row[0].strip().lower() == 'currency':
+                    continue
+                currency = row[0].strip().upper()
+                try:
+                    rate = Decimal(row[1].strip())
+                except (IndexError, InvalidOperation):
+                    raise ValueError(f"Invalid exchange rate row: {row!r}")
+                if not rate.is_finite() or rate <= 0:
+                    raise ValueError(f"Invalid exchange rate for {currency}: {rate}")
+                if rate.adjusted() > 15 or rate.adjusted() < -15:
+                    raise ValueError(f"Exchange rate for {currency} is out of range: {rate}")
+                exact = Fraction(rate)
+                if max(exact.numerator, exact.denominator) > MAX_RATE_TERM:
+                    raise ValueError(f"Exchange rate for {currency} has too many significant digits: {rate}")
+                rates.append((currency, exact.numerator, exact.denominator, loaded_at))
+        loaded = {rate[0] for rate in rates}
+        with db_manager.connect() as conn:
+            c = conn.cursor()
+            # Refuse to strand existing amounts: anything without a rate would drop out of every total
+            c.execute('SELECT currency FROM Expenses UNION SELECT currency FROM RecurringSchedules')
+            missing = sorted(({row[0] for row in c.fetchall()} | {app.config['BASE_CURRENCY']}) - loaded)
+            if missing:
+                raise ValueError(f"Rate file has no rate for {', '.join(missing)}, "
+                                 "which the base currency or existing expenses and schedules still use")
+            c.execute('DELETE FROM ExchangeRates')
+            c.executemany('INSERT INTO ExchangeRates (currency, rate_num, rate_den, loaded_at) VALUES (?, ?, ?, ?)', rates)
+            GoalProgress.revalue(c)
+            conn.commit()
+        totals_cache.invalidate()
+        return len(rates)
+
+    @staticmethod
+    def to_base(db_manager, amount):
+        """Convert a Money to the base currency the way CONVERTED_EXPENSES does, or None without rates"""
+        base = app.config['BASE_CURRENCY']
+        if amount.currency == base:
+            return amount
+        with db_manager.connect() as conn:
+            c = conn.cursor()
+            c.execute('''SELECT r.rate_num, r.rate_den, b.rate_num, b.rate_den
+                         FROM ExchangeRates r JOIN ExchangeRates b ON b.currency = ? WHERE r.currency = ?''',
+                      (base, amount.currency))
+            row = c.fetchone()
+        if row is None:
+            return None
+        r_num, r_den, b_num, b_den = row
+        return Money((amount.cents * r_num * b_den * 2 + r_den * b_num) // (2 * r_den * b_num), base)
+
+    @staticmethod
+    def currencies(db_manager):
+        """Currencies expenses can be recorded in, base currency first"""
+        base = app.config['BASE_CURRENCY']
+        with db_manager.connect() as conn:
+            c = conn.cursor()
+            # Without a base rate nothing converts, so only the base currency is offered
+            c.execute('''SELECT currency FROM ExchangeRates WHERE currency != ?
+                         AND EXISTS (SELECT 1 FROM ExchangeRates WHERE currency = ?) ORDER BY currency''', (base, base))
+            return [base] + [row[0] for row in c.fetchall()]
+
+class CronSchedule: # A cron-like day pattern "day-of-month month day-of-week", e.g. "1,15 * *" or "* * 1-5".
+    FIELD_RANGES = ((1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) == 5:
+            # Accept full crontab lines; occurrences are whole days, so minute and hour are ignored
+            fields = fields[2:]
+        if len(fields) != 3:
+            raise ValueError(f"Expected 'day-of-month month day-of-week', got {expression!r}")
+        self.expression = ' '.join(fields)
+        self.days, self.months, self.weekdays = (
+            self._parse_field(field, low, high) for field, (low, high) in zip(fields, self.FIELD_RANGES))
+        if 7 in self.weekdays:
+            self.weekdays.add(0)
+        self._any_day = fields[0] == '*'
+        self._any_weekday = fields[2] == '*'
+
+    @staticmethod
+    def _parse_field(field, low, high):
+        values = set()
+        for part in field.split(','):
+            step = 1
+            if '/' in part:
+                part, step = part.split('/', 1)
+                step = int(step)
+            if part == '*':
+                start, end = low, high
+            elif '-' in part:
+                start, end = (int(v) for v in part.split('-', 1))
+            else:
+                start = int(part)
+                end = high if step > 1 else start
+            if step < 1 or start < low or end > high or start > end:
+                raise ValueError(f"Invalid cron field {field!r}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def matches(self, day):
+        if day.month not in self.months:
+            return False
+        weekday = (day.weekday() + 1) % 7  # cron counts from Sunday = 0
+        # As in cron, a restricted day-of-month and day-of-week match if either does
+        if not self._any_day and not self._any_weekday:
+            return day.day in self.days or weekday in self.weekdays
+        return day.day in self.days and weekday in self.weekdays
+
+class RecurringSchedule: # Represents a recurring expense (rent, subscriptions, ...) that is materialized into Expenses.
+    FREQUENCIES = ('daily', 'weekly', 'monthly', 'cron')
+    # A cron pattern that has not matched for this many days is treated as exhausted (covers Feb 29)
+    CRON_LOOKAHEAD_DAYS = 366 * 8
+
+    def __init__(self, amount, description, category, frequency, start_date, end_date=None, cron=None):
+        if frequency not in self.FREQUENCIES:
+            raise ValueError(f"Unknown frequency: {frequency}")
+        if frequency == 'cron':
+            cron = CronSchedule(cron or '').expression
+        self.amount = amount
+        self.description = description
+        self.category = category
+        self.frequency = frequency
+        self.cron = cron if frequency == 'cron' else None
+        self.start_date = dt_date.fromisoformat(start_date)
+        self.end_date = dt_date.fromisoformat(end_date) if end_date else None
+        if self.end_date and self.end_date < self.start_date:
+            raise ValueError(f"End date {self.end_date} is before the start date {self.start_date}")
+        if next(self.occurrences(self.frequency, self.start_date, self.start_date, self.cron), None) is None:
+            raise ValueError(f"Schedule {cron!r} never occurs")
+
+    @staticmethod
+    def occurrences(frequency, anchor, start, cron=None):
+        """Yield occurrence dates on or after start; anchor is the schedule's first day"""
+        if frequency == 'daily':
+            step = timedelta(days=1)
+        elif frequency == 'weekly':
+            step = timedelta(days=7)
+            start = start + timedelta(days=(anchor - start).days % 7)
+        elif frequency == 'monthly':
+            year, month = start.year, start.month
+            while True:
+                # Anchored on the 29th-31st, short months fall back to their last day
+                day = dt_date(year, month, min(anchor.day, monthrange(year, month)[1]))
+                if day >= start:
+                    yield day
+                year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        else:
+            spec = CronSchedule(cron)
+            day, misses = start, 0
+            while misses <= RecurringSchedule.CRON_LOOKAHEAD_DAYS:
+                if spec.matches(day):
+                    yield day
+                    misses = 0
+                else:
+                    misses += 1
+                day += timedelta(days=1)
+            return
+        day = start
+        while True:
+            yield day
+            day += step
+
+    def save(self, db_manager):
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with db_manager.connect() as conn:
+            c = conn.cursor()
+            c.execute('''INSERT INTO RecurringSchedules (amount_cents, currency, description, category, frequency, cron,
+                                                         start_date, end_date, next_date, created_at)
+                         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                      (self.amount.cents, self.amount.currency, self.description, self.category, self.frequency, self.cron,
+                       self.start_date.isoformat(), self.end_date.isoformat() if self.end_date else None,
+                       self.start_date.isoformat(), now))
+            conn.commit()
+
+    @staticmethod
+    def delete(db_manager, schedule_id):
+        """Stop a schedule; expenses it already generated are kept"""
+        with db_manager.connect() as conn:
+            c = conn.cursor()
+            c.execute('DELETE FROM RecurringSchedules WHERE id = ?', (schedule_id,))
+            conn.commit()
+
+    @staticmethod
+    def get_all(db_manager):
+        with db_manager.connect() as conn:
+            c = conn.cursor()
+            c.execute('''SELECT id, amount_cents, currency, description, category, frequency, cron, start_date, end_date, next_date
+                         FROM RecurringSchedules ORDER BY id''')
+            return c.fetchall()
+
+class ScheduleMaterializer: # Generates due occurrences of recurring schedules as expenses, in batched transactions.
+    def __init__(self, db_manager, batch_size=None):
+        self.db_manager = db_manager
+        self.batch_size = batch_size or app.config['MATERIALIZE_BATCH_SIZE']
+        self._run_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self.stats = {'runs': 0, 'rows_generated': 0, 'last_run_at': None, 'last_run_ms': None, 'last_run_rows': 0}
+
+    def run(self, today=None):
+        """Materialize every occurrence due up to today and return how many expenses were created.
+
+        Each schedule remembers the first date it has not materialized yet, so a run after
+        downtime catches up from there. Inserts are idempotent, so overlapping runs are harmless.
+        """
+        today = today or dt_date.today()
+        with self._run_lock:
+            started = time.perf_counter()
+            with self.db_manager.connect() as conn:
+                c = conn.cursor()
+                c.execute('''SELECT id, amount_cents, currency, description, category, frequency, cron, start_date, end_date, next_date
+                             FROM RecurringSchedules
+                             WHERE next_date <= ? AND (end_date IS NULL OR next_date <= end_date)''', (today.isoformat(),))
+                due = c.fetchall()
+            generated = sum(self._materialize(schedule, today) for schedule in due)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.stats['runs'] += 1
+            self.stats['rows_generated'] += generated
+            self.stats['last_run_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            self.stats['last_run_ms'] = round(elapsed_ms, 2)
+            self.stats['last_run_rows'] = generated
+        if generated:
+            totals_cache.invalidate()
+        app.logger.info("Materialized %d occurrences from %d schedules in %.2f ms", generated, len(due), elapsed_ms)
+        return generated
+
+    def _materialize(self, schedule, today):
+        schedule_id, amount_cents, currency, description, category, frequency, cron, start_date, end_date, next_date = schedule
+        until = min(today, dt_date.fromisoformat(end_date)) if end_date else today
+        occurrences = RecurringSchedule.occurrences(frequency, dt_date.fromisoformat(start_date),
+                                                    dt_date.fromisoformat(next_date), cron)
+        upcoming = next(occurrences, None)
+        generated = 0
+        while upcoming is not None and upcoming <= until:
+            batch = []
+            while upcoming is not None and upcoming <= until and len(batch) < self.batch_size:
+                batch.append(upcoming)
+                upcoming = next(occurrences, None)
+            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            with self.db_manager.connect() as conn:
+                c = conn.cursor()
+                c.execute('SELECT COALESCE(MAX(id), 0) FROM Expenses')
+                last_id = c.fetchone()[0]
+                c.executemany('''INSERT OR IGNORE INTO Expenses (amount_cents, currency, date, description, category, timestamp, schedule_id)
+                                 VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                              [(amount_cents, currency, day.isoformat(), description, category, timestamp, schedule_id)
+                               for day in batch])
+                inserted = c.rowcount
+                generated += inserted
+                if category == 'saving' and inserted:
+                    # Rows above the previous maximum id are exactly the ones this batch inserted
+                    c.execute('''SELECT id FROM Expenses WHERE schedule_id = ? AND id > ?
+                                 AND NOT EXISTS (SELECT 1 FROM GoalProgress p WHERE p.expense_id = Expenses.id)''',
+                              (schedule_id, last_id))
+                    GoalProgress.record_expenses(c, [row[0] for row in c.fetchall()])
+                # Advance in the same transaction so a crash never skips or repeats a batch
+                c.execute('UPDATE RecurringSchedules SET next_date = ? WHERE id = ?',
+                          (upcoming.isoformat() if upcoming else None, schedule_id))
+                conn.commit()
+        return generated
+
+    def start(self, interval=None):
+        """Run now and then every interval seconds on a daemon thread; later calls are no-ops"""
+        if self._thread is not None:
+            return self._thread
+        interval = interval or app.config['MATERIALIZE_INTERVAL']
+
+        def loop():
+            while True:
+                try:
+                    self.run()
+                except Exception:
+                    app.logger.exception("Recurring schedule materialization failed")
+                time.sleep(interval)
+
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=loop, name='smartspend-materializer', daemon=True)
+                self._thread.start()
+        return self._thread
+
+class PrecompressedAsset: # A versioned in-memory asset, compressed once and served with ETag and immutable caching.
+    def __init__(self, data, mimetype):
+        self.data = data
+        self.mimetype = mimetype
+        self.version = hashlib.sha256(data).hexdigest()[:12]
+        self.encoded = {'gzip': gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            self.encoded['br'] = brotli.compress(data)
+
+    def response(self):
+        encoding = max((e for e in self.encoded if request.accept_encodings[e]),
+                       key=lambda e: (request.accept_encodings[e], e == 'br'), default=None)
+        # Each encoding is a different representation, so each gets its own strong validator
+        etag = f"{self.version}-{encoding or 'identity'}"
+        if etag in request.if_none_match:
+            response = app.response_class(status=304)
+        else:
+            response = app.response_class(self.encoded[encoding] if encoding else self.data, mimetype=self.mimetype)
+            if encoding:
+                response.content_encoding = encoding
+        response.set_etag(etag)
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.max_age = ASSET_MAX_AGE
+        response.cache_control.immutable = True
+        return response
+
+EXPENSE_CATEGORIES = [
+    'Groceries', 'Transport', 'Entertainment', 'Utilities', 'Shopping', 'Health', 'Dining', 'Education',
+    'Travel', 'Personal Care', 'Insurance', 'Taxes', 'Gifts', 'Charity', 'Subscriptions', 'Home Improvement',
+    'Automotive', 'Childcare', 'Pet Care', 'Mortgage', 'Miscellaneous', 'Other'
+]
+KEYWORDS_TO_CATEGORIES = {
+    "bus,uber,fuel,petrol,train,metro,taxi,bike": "Transport",
+    "grocery,aldi,coles,woolworths,supermarket,market": "Groceries",
+    "movie,cinema,netflix,spotify,concert,theater": "Entertainment",
+    "electricity,water,internet,phone,bill,gas": "Utilities",
+    "clothes,shopping,amazon,ebay,apparel": "Shopping",
+    "doctor,pharmacy,hospital,medicine,clinic": "Health",
+    "restaurant,cafe,coffee,food,dining,meal": "Dining",
+    "school,university,books,education,course": "Education",
+    "flight,hotel,airbnb,travel,tour,vacation": "Travel",
+    "haircut,spa,beauty,personal care": "Personal Care",
+    "insurance,health insurance,car insurance,home insurance": "Insurance",
+    "tax,taxes,income tax": "Taxes",
+    "gift,present,birthday,anniversary": "Gifts",
+    "charity,donation": "Charity",
+    "subscription,netflix,spotify,amazon prime": "Subscriptions",
+    "home improvement,repair,maintenance": "Home Improvement",
+    "car,automotive,auto,repair,fuel": "Automotive",
+    "childcare,baby,kids": "Childcare",
+    "pet,vet,pet care": "Pet Care",
+    "mortgage,home loan,property loan": "Mortgage",
+    "misc,other,miscellaneous": "Miscellaneous"
+}
+KEYWORDS_ASSET = PrecompressedAsset(json.dumps(KEYWORDS_TO_CATEGORIES, separators=(',', ':')).encode('utf-8'),
+                                    'application/json')
+
+_static_fingerprints = {}
+
+def static_fingerprint(filename):
+    """Short content hash of a file in static/, recomputed only when its mtime changes"""
+    path = os.path.join(app.static_folder, filename)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    cached = _static_fingerprints.get(filename)
+    if cached is None or cached[0] != mtime:
+        with open(path, 'rb') as f:
+            cached = (mtime, hashlib.sha256(f.read()).hexdigest()[:12])
+        _static_fingerprints[filename] = cached
+    return cached[1]
+
+@app.url_defaults
+def fingerprint_static_urls(endpoint, values): # Adds ?v=<content hash> to static URLs so they can be cached forever.
+    if endpoint == 'static' and 'filename' in values and 'v' not in values:
+        version = static_fingerprint(values['filename'])
+        if version:
+            values['v'] = version
+
+@app.before_request
+def start_materializer(): # The first request in each serving process (flask run, WSGI worker, ...) starts the background materializer.
+    if app.config['MATERIALIZE_INTERVAL'] > 0:
+        materializer.start()
+
+@app.before_request
+def start_db_stats():
+    if app.config['DB_STATS']:
+        _request_db_stats.set(DbStats())
+
+@app.after_request
+def report_db_stats(response):
+    stats = _request_db_stats.get()
+    if stats is not None:
+        response.headers['X-DB-Time-Ms'] = f"{stats.ms:.2f}"
+        response.headers['X-DB-Busy'] = str(stats.busy)
+    return response
+
+@app.after_request
+def cache_fingerprinted_static(response): # Fingerprinted static files never change under the same URL.
+    # Only the current hash counts: an old instance answering a new ?v= mid-deploy must not pin its content
+    if (request.endpoint == 'static' and response.status_code == 200
+            and request.args.get('v') == static_fingerprint(request.view_args['filename'])):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = ASSET_MAX_AGE
+        response.cache_control.immutable = True
+    return response
+
+def precompile_templates():
+    """Compile every template up front (through the bytecode cache) so no request pays for parsing"""
+    started = time.perf_counter()
+    names = app.jinja_env.list_templates()
+    for name in names:
+        app.jinja_env.get_template(name)
+    app.logger.info("Compiled %d templates in %.2f ms", len(names), (time.perf_counter() - started) * 1000)
+
 db_manager = DatabaseManager()
+materializer = ScheduleMaterializer(db_manager)
+
+def period_totals_queries(period_fmt, query_period):
+    """Aggregate queries for one summary period, converted to the base currency"""
+    base = app.config['BASE_CURRENCY']
+    return {
+        'summary_data': (f'SELECT category, SUM(base_cents) FROM {CONVERTED_EXPENSES} WHERE strftime("{period_fmt}", date) = ? GROUP BY category', (base, query_period)),
+        'total_spent': (f'SELECT SUM(base_cents) FROM {CONVERTED_EXPENSES} WHERE strftime("{period_fmt}", date) = ? AND category != "saving"', (base, query_period)),
+        'total_saved': (f'SELECT SUM(base_cents) FROM {CONVERTED_EXPENSES} WHERE category = "saving" AND strftime("{period_fmt}", date) = ?', (base, query_period)),
+        'unconverted': (f'{UNCONVERTED_COUNT} AND strftime("{period_fmt}", date) = ?', (base, query_period)),
+    }
+
+def period_totals_from_rows(rows):
+    return {
+        'summary_data': [tuple(row) for row in rows['summary_data']],
+        'total_spent': Money(rows['total_spent'][0][0]),
+        'total_saved': Money(rows['total_saved'][0][0]),
+        'unconverted': rows['unconverted'][0][0],
+    }
+
+@app.cli.command('import-rates')
+@click.argument('path')
+def import_rates(path): # Loads exchange rates from a local CSV file, e.g. `flask --app app import-rates rates.csv`.
+    try:
+        count = ExchangeRate.load_file(db_manager, path)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    print(f"Loaded {count} exchange rates")
+
+@app.cli.command('materialize')
+def materialize(): # Generates due recurring expenses once, e.g. from cron instead of the background thread.
+    generated = materializer.run()
+    print(f"Generated {generated} expenses in {materializer.stats['last_run_ms']} ms")
+
+@app.cli.command('compile-templates')
+def compile_templates(): # Fills the template bytecode cache ahead of deployment.
+    if _bytecode_cache is None:
+        raise click.ClickException(f"Template cache directory {app.config['TEMPLATE_CACHE_DIR']} is not writable")
+    precompile_templates()
+    print(f"Compiled templates into {app.config['TEMPLATE_CACHE_DIR']}")
+
+@app.route('/assets/keywords.<version>.json')
+def keywords_asset(version): # Serves the category keyword map; old versions 404 so stale pages refetch.
+    if version != KEYWORDS_ASSET.version:
+        abort(404)
+    return KEYWORDS_ASSET.response()
 
 @app.route('/')
 def index(): # Redirects to the login page.
@@ -231,7 +1219,15 @@ def login(): # Handles user login and first-time setup.
 def settings():
     user = User.get_user(db_manager)
     current_email = user.email if user else ''
-    return render_template('settings.html', current_email=current_email)
+    return render_template('settings.html', current_email=current_email,
+                           schedules=RecurringSchedule.get_all(db_manager),
+                           materializer_stats=materializer.stats)
+
+@app.route('/delete-schedule/<int:schedule_id>', methods=['POST'])
+def delete_schedule(schedule_id):
+    RecurringSchedule.delete(db_manager, schedule_id)
+    flash("Recurring expense stopped.")
+    return redirect('/settings')
 
 @app.route('/update-settings', methods=['POST'])
 def update_settings():
@@ -248,61 +1244,63 @@ def update_settings():
 
 @app.route('/home')
 def home():
-    with db_manager.connect() as conn:
-        c = conn.cursor()
-        
+    base = app.config['BASE_CURRENCY']
+    rows = db_manager.fetch_many({
         # Get income data
-        c.execute('SELECT yearly FROM Income ORDER BY id DESC LIMIT 1')
-        result = c.fetchone()
-        yearly = result[0] if result else None
-        monthly = round(yearly / 12, 2) if yearly else None
-        weekly = round(yearly / 52, 2) if yearly else None
-
+        'income': ('SELECT yearly_cents, monthly_cents, weekly_cents FROM Income ORDER BY id DESC LIMIT 1', ()),
         # Get weekly and monthly expenses in single query using UNION
-        c.execute('''
-            SELECT 'week' as period, SUM(amount) as total 
-            FROM Expenses 
+        'period_totals': (f'''
+            SELECT 'week' as period, SUM(base_cents) as total 
+            FROM {CONVERTED_EXPENSES}
             WHERE date >= date("now", "-7 day") AND category != "saving"
             UNION ALL
-            SELECT 'month' as period, SUM(amount) as total 
-            FROM Expenses 
+            SELECT 'month' as period, SUM(base_cents) as total 
+            FROM {CONVERTED_EXPENSES}
             WHERE strftime("%Y-%m", date) = strftime("%Y-%m", "now") AND category != "saving"
-        ''')
-        period_totals = c.fetchall()
-        total_week = period_totals[0][1] or 0 if len(period_totals) > 0 else 0
-        total_month = period_totals[1][1] or 0 if len(period_totals) > 1 else 0
-
+        ''', (base, base)),
         # Get total saved
-        c.execute('SELECT SUM(amount) FROM Expenses WHERE category = "saving"')
-        total_saved = c.fetchone()[0] or 0
-
+        'total_saved': (f'SELECT SUM(base_cents) FROM {CONVERTED_EXPENSES} WHERE category = "saving"', (base,)),
+        # Expenses left out of the totals because their currency has no exchange rate
+        'unconverted': (UNCONVERTED_COUNT, (base,)),
         # Get weekly and monthly category summaries in single query
-        c.execute('''
-            SELECT 'week' as period, category, SUM(amount) as total
-            FROM Expenses 
+        'category_summaries': (f'''
+            SELECT 'week' as period, category, SUM(base_cents) as total
+            FROM {CONVERTED_EXPENSES}
             WHERE date >= date("now", "-7 day") AND category != "saving"
             GROUP BY category
             UNION ALL
-            SELECT 'month' as period, category, SUM(amount) as total
-            FROM Expenses 
+            SELECT 'month' as period, category, SUM(base_cents) as total
+            FROM {CONVERTED_EXPENSES}
             WHERE strftime("%Y-%m", date) = strftime("%Y-%m", "now") AND category != "saving"
             GROUP BY category
-        ''')
-        all_category_summaries = c.fetchall()
-        
-        # Separate week and month summaries
-        week_category_summary = [(cat, total) for period, cat, total in all_category_summaries if period == 'week']
-        month_category_summary = [(cat, total) for period, cat, total in all_category_summaries if period == 'month']
-
+        ''', (base, base)),
         # Get active goal
-        c.execute('SELECT name, target_amount FROM Goals WHERE is_active = 1 LIMIT 1')
-        active_goal = c.fetchone()
-        active_goal_name = active_goal[0] if active_goal else None
-        active_goal_target = active_goal[1] if active_goal else None
+        'active_goal': ('SELECT name, target_cents, saved_cents FROM Goals WHERE is_active = 1 LIMIT 1', ()),
+        # Fetch all goals with their running savings totals
+        'all_goals': ('SELECT name, target_cents, saved_cents, completed FROM Goals', ()),
+    })
+
+    result = rows['income'][0] if rows['income'] else None
+    yearly = Money(result[0]) if result else None
+    monthly = Money(result[1]) if yearly else None
+    weekly = Money(result[2]) if yearly else None
+
+    period_totals = rows['period_totals']
+    total_week = Money(period_totals[0][1] if len(period_totals) > 0 else 0)
+    total_month = Money(period_totals[1][1] if len(period_totals) > 1 else 0)
 
-        # Fetch all goals
-        c.execute('SELECT name, target_amount FROM Goals')
-        all_goals = c.fetchall()
+    total_saved = Money(rows['total_saved'][0][0])
+
+    # Separate week and month summaries
+    all_category_summaries = rows['category_summaries']
+    week_category_summary = [(cat, total) for period, cat, total in all_category_summaries if period == 'week']
+    month_category_summary = [(cat, total) for period, cat, total in all_category_summaries if period == 'month']
+
+    active_goal = rows['active_goal'][0] if rows['active_goal'] else None
+    active_goal_name = active_goal[0] if active_goal else None
+    active_goal_target = Money(active_goal[1]) if active_goal else None
+
+    all_goals = rows['all_goals']
 
     return render_template('home.html', yearly=yearly, monthly=monthly, weekly=weekly,
                            total_week=total_week, total_month=total_month, total_saved=total_saved,
@@ -310,83 +1308,78 @@ def home():
                            month_category_summary=month_category_summary,
                            active_goal_name=active_goal_name,
                            active_goal_target=active_goal_target,
-                           all_goals=all_goals)
+                           all_goals=all_goals, unconverted=rows['unconverted'][0][0])
 
 @app.route('/set-income', methods=['POST'])
 def set_income():
-    income = float(request.form['income'])
+    income = Money.parse(request.form['income'])
     income_obj = Income(income)
     income_obj.save(db_manager)
     return redirect('/home')
 
 @app.route('/add')
 def add_expense():
-    categories = [
-        'Groceries', 'Transport', 'Entertainment', 'Utilities', 'Shopping', 'Health', 'Dining', 'Education',
-        'Travel', 'Personal Care', 'Insurance', 'Taxes', 'Gifts', 'Charity', 'Subscriptions', 'Home Improvement',
-        'Automotive', 'Childcare', 'Pet Care', 'Mortgage', 'Miscellaneous', 'Other'
-    ]
-    keywords_map = {
-        "bus,uber,fuel,petrol,train,metro,taxi,bike": "Transport",
-        "grocery,aldi,coles,woolworths,supermarket,market": "Groceries",
-        "movie,cinema,netflix,spotify,concert,theater": "Entertainment",
-        "electricity,water,internet,phone,bill,gas": "Utilities",
-        "clothes,shopping,amazon,ebay,apparel": "Shopping",
-        "doctor,pharmacy,hospital,medicine,clinic": "Health",
-        "restaurant,cafe,coffee,food,dining,meal": "Dining",
-        "school,university,books,education,course": "Education",
-        "flight,hotel,airbnb,travel,tour,vacation": "Travel",
-        "haircut,spa,beauty,personal care": "Personal Care",
-        "insurance,health insurance,car insurance,home insurance": "Insurance",
-        "tax,taxes,income tax": "Taxes",
-        "gift,present,birthday,anniversary": "Gifts",
-        "charity,donation": "Charity",
-        "subscription,netflix,spotify,amazon prime": "Subscriptions",
-        "home improvement,repair,maintenance": "Home Improvement",
-        "car,automotive,auto,repair,fuel": "Automotive",
-        "childcare,baby,kids": "Childcare",
-        "pet,vet,pet care": "Pet Care",
-        "mortgage,home loan,property loan": "Mortgage",
-        "misc,other,miscellaneous": "Miscellaneous"
-    }
-    from datetime import date as dt_date
     return render_template(
         'add.html',
-        categories=categories,
-        keywords_to_categories=keywords_map,
+        categories=EXPENSE_CATEGORIES,
+        keywords_url=url_for('keywords_asset', version=KEYWORDS_ASSET.version),
+        currencies=ExchangeRate.currencies(db_manager),
         today=dt_date.today().isoformat()
     )
 
 @app.route('/save-expense', methods=['POST'])
 def save_expense():
+    currency = request.form.get('currency', app.config['BASE_CURRENCY']).strip().upper()
+    if currency not in ExchangeRate.currencies(db_manager):
+        flash(f"Unsupported currency: {currency}")
+        return redirect('/add')
+
     try:
         amount_str = request.form['amount'].strip()
         if not amount_str:
             flash("Please enter an expense amount")
             return redirect('/add')
         
-        amount = float(amount_str)
+        amount = Money.parse(amount_str, currency)
         
-        if amount < 0:
-            flash(f"Expense amount cannot be negative: ${abs(amount):.2f}")
+        if amount.cents < 0:
+            flash(f"Expense amount cannot be negative: {abs(amount)}")
             return redirect('/add')
-        elif amount == 0:
-            flash("Expense amount must be greater than $0.00")
+        elif amount.cents == 0:
+            flash(f"Expense amount must be greater than {Money(0, amount.currency)}")
             return redirect('/add')
-        elif amount > 1000000:
-            flash("Expense amount is too large (maximum: $1,000,000)")
+        elif ExchangeRate.to_base(db_manager, amount).cents > MAX_AMOUNT_CENTS:
+            # The limit applies to the converted amount, so large-unit currencies (VND, JPY, ...) aren't capped early
+            flash(f"Expense amount is too large (maximum: {Money(MAX_AMOUNT_CENTS)})")
             return redirect('/add')
             
     except ValueError:
         flash("Please enter a valid number for the expense amount")
         return redirect('/add')
     
-    date_val = request.form['date']
+    try:
+        date_val = dt_date.fromisoformat(request.form['date']).isoformat()
+    except ValueError:
+        flash("Please enter a valid expense date (YYYY-MM-DD)")
+        return redirect('/add')
     description = request.form['description']
     category = request.form['category']
+    repeat = request.form.get('repeat', 'none')
+    if repeat != 'none':
+        try:
+            schedule = RecurringSchedule(amount, description, category, repeat, date_val,
+                                         end_date=request.form.get('end_date') or None, cron=request.form.get('cron'))
+        except ValueError as e:
+            flash(f"Invalid recurring schedule: {e}")
+            return redirect('/add')
+        schedule.save(db_manager)
+        materializer.run()
+        flash(f"Recurring expense of {amount} scheduled ({repeat})")
+        return redirect('/home')
+
     expense = Expense(amount, date_val, description, category)
     expense.save(db_manager)
-    flash(f"Expense of ${amount:.2f} added successfully!")
+    flash(f"Expense of {amount} added successfully!")
     return redirect('/home')
 
 @app.route('/summary')
@@ -394,97 +1387,72 @@ def summary():
     view_mode = request.args.get('view', 'monthly')
     selected_period_label = request.args.get('period')
 
-    with db_manager.connect() as conn:
-        c = conn.cursor()
-
-        c.execute('SELECT DISTINCT strftime("%Y-%m", date) FROM Expenses ORDER BY date DESC')
-        month_keys = [row[0] for row in c.fetchall()]
-        c.execute('SELECT DISTINCT strftime("%Y-%W", date) FROM Expenses ORDER BY date DESC')
-        week_keys = [row[0] for row in c.fetchall()]
-
-        month_periods = [month_name[int(m.split("-")[1])] + " " + m.split("-")[0] for m in month_keys]
-        week_periods = [f"Week {int(w.split('-')[1])} {w.split('-')[0]}" for w in week_keys]
-
-        if not selected_period_label:
-            if view_mode == 'monthly' and month_keys:
-                selected_period_label = month_periods[0]
-            elif view_mode == 'weekly' and week_keys:
-                selected_period_label = week_periods[0]
-
-        if view_mode == 'monthly':
-            periods = month_periods
-            if selected_period_label in periods:
-                idx = periods.index(selected_period_label)
-                query_period = month_keys[idx]
-            else:
-                query_period = datetime.now().strftime('%Y-%m')
-                selected_period_label = month_name[int(query_period.split('-')[1])] + " " + query_period.split('-')[0]
+    keys = db_manager.fetch_many({
+        'month_keys': ('SELECT DISTINCT strftime("%Y-%m", date) FROM Expenses ORDER BY date DESC', ()),
+        'week_keys': ('SELECT DISTINCT strftime("%Y-%W", date) FROM Expenses ORDER BY date DESC', ()),
+    })
+    month_keys = [row[0] for row in keys['month_keys']]
+    week_keys = [row[0] for row in keys['week_keys']]
+
+    month_periods = [month_name[int(m.split("-")[1])] + " " + m.split("-")[0] for m in month_keys]
+    week_periods = [f"Week {int(w.split('-')[1])} {w.split('-')[0]}" for w in week_keys]
+
+    if not selected_period_label:
+        if view_mode == 'monthly' and month_keys:
+            selected_period_label = month_periods[0]
+        elif view_mode == 'weekly' and week_keys:
+            selected_period_label = week_periods[0]
+
+    if view_mode == 'monthly':
+        periods = month_periods
+        if selected_period_label in periods:
+            idx = periods.index(selected_period_label)
+            query_period = month_keys[idx]
         else:
-            periods = week_periods
-            if selected_period_label in periods:
-                idx = periods.index(selected_period_label)
-                query_period = week_keys[idx]
-            else:
-                query_period = datetime.now().strftime('%Y-%W')
-                selected_period_label = f"Week {int(query_period.split('-')[1])} {query_period.split('-')[0]}"
-
-        try:
-            if view_mode == 'monthly':
-                c.execute('SELECT * FROM Expenses WHERE strftime("%Y-%m", date) = ? ORDER BY date DESC', (query_period,))
-            else:
-                c.execute('SELECT * FROM Expenses WHERE strftime("%Y-%W", date) = ? ORDER by date DESC', (query_period,))
-            expenses = c.fetchall()
-
-            if view_mode == 'monthly':
-                c.execute('SELECT category, SUM(amount) FROM Expenses WHERE strftime("%Y-%m", date) = ? GROUP BY category', (query_period,))
-            else:
-                c.execute('SELECT category, SUM(amount) FROM Expenses WHERE strftime("%Y-%W", date) = ? GROUP BY category', (query_period,))
-            summary_data = c.fetchall()
-
-            if view_mode == 'monthly':
-                c.execute('SELECT SUM(amount) FROM Expenses WHERE strftime("%Y-%m", date) = ? AND category != "saving"', (query_period,))
-                total_spent = c.fetchone()[0] or 0
-                c.execute('SELECT SUM(amount) FROM Expenses WHERE category = "saving" AND strftime("%Y-%m", date) = ?', (query_period,))
-                total_saved = c.fetchone()[0] or 0
-            else:
-                c.execute('SELECT SUM(amount) FROM Expenses WHERE strftime("%Y-%W", date) = ? AND category != "saving"', (query_period,))
-                total_spent = c.fetchone()[0] or 0
-                c.execute('SELECT SUM(amount) FROM Expenses WHERE category = "saving" AND strftime("%Y-%W", date) = ?', (query_period,))
-                total_saved = c.fetchone()[0] or 0
-
-            c.execute('SELECT target_amount FROM Goals WHERE is_active = 1')
-            goal = c.fetchone()
-            saving_percent = 0
-            if goal and goal[0] > 0:
-                saving_percent = int(round((total_saved / goal[0]) * 100))
-                saving_percent = max(0, min(saving_percent, 100))
-        except Exception as e:
-            print(f"Error fetching summary data: {e}")
-            expenses = []
-            summary_data = []
-            total_spent = 0
-            total_saved = 0
-            saving_percent = 0
-
-        try:
-            total_spent = float(total_spent)
-        except (TypeError, ValueError):
-            total_spent = 0.0
-        try:
-            total_saved = float(total_saved)
-        except (TypeError, ValueError):
-            total_saved = 0.0
-
-        summary_data = [(cat, float(tot) if tot is not None else 0.0) for cat, tot in summary_data]
-
-        expenses = [(
-            exp[0],
-            float(exp[1]) if exp[1] is not None else 0.0,
-            exp[2],
-            exp[3],
-            exp[4],
-            exp[5]
-        ) for exp in expenses]
+            query_period = datetime.now().strftime('%Y-%m')
+            selected_period_label = month_name[int(query_period.split('-')[1])] + " " + query_period.split('-')[0]
+    else:
+        periods = week_periods
+        if selected_period_label in periods:
+            idx = periods.index(selected_period_label)
+            query_period = week_keys[idx]
+        else:
+            query_period = datetime.now().strftime('%Y-%W')
+            selected_period_label = f"Week {int(query_period.split('-')[1])} {query_period.split('-')[0]}"
+
+    period_fmt = '%Y-%m' if view_mode == 'monthly' else '%Y-%W'
+    totals_key = (period_fmt, query_period, app.config['BASE_CURRENCY'])
+    totals, generation = totals_cache.get(totals_key, totals_cache.data_version(db_manager))
+    queries = {
+        'expenses': (f'SELECT id, amount_cents, date, description, category, timestamp, currency FROM Expenses WHERE strftime("{period_fmt}", date) = ? ORDER BY date DESC', (query_period,)),
+        'goal': ('SELECT target_cents FROM Goals WHERE is_active = 1', ()),
+    }
+    if totals is None:
+        queries.update(period_totals_queries(period_fmt, query_period))
+    try:
+        rows = db_manager.fetch_many(queries)
+        expenses = rows['expenses']
+        if totals is None:
+            totals = period_totals_from_rows(rows)
+            totals_cache.put(totals_key, totals, generation)
+        summary_data = totals['summary_data']
+        total_spent = totals['total_spent']
+        total_saved = totals['total_saved']
+        unconverted = totals['unconverted']
+
+        goal = rows['goal'][0] if rows['goal'] else None
+        saving_percent = 0
+        if goal and goal[0] > 0:
+            saving_percent = int(round(total_saved.cents * 100 / goal[0]))
+            saving_percent = max(0, min(saving_percent, 100))
+    except Exception as e:
+        print(f"Error fetching summary data: {e}")
+        expenses = []
+        summary_data = []
+        total_spent = Money(0)
+        total_saved = Money(0)
+        unconverted = 0
+        saving_percent = 0
 
     return render_template(
         'summary.html',
@@ -492,6 +1460,7 @@ def summary():
         summary_data=summary_data,
         total_spent=total_spent,
         total_saved=total_saved,
+        unconverted=unconverted,
         saving_percent=saving_percent,
         periods=periods,
         selected_period=selected_period_label,
@@ -502,33 +1471,36 @@ def summary():
 def saving():
     with db_manager.connect() as conn:
         c = conn.cursor()
-        c.execute('SELECT * FROM Goals')
+        c.execute('SELECT id, name, target_cents, is_active, created_at, updated_at, saved_cents, completed, completed_at FROM Goals')
         goals_raw = c.fetchall()
 
-        c.execute('SELECT SUM(amount) FROM Expenses WHERE category = "saving"')
-        total_saved = c.fetchone()[0] or 0.0
+        base = app.config['BASE_CURRENCY']
+        c.execute(f'SELECT SUM(base_cents) FROM {CONVERTED_EXPENSES} WHERE category = "saving"', (base,))
+        total_saved = Money(c.fetchone()[0])
 
         goals = []
         for goal in goals_raw:
-            goal_id = goal[0]
-            target_amount = goal[2]
-
-            c.execute('SELECT SUM(amount) FROM Expenses WHERE category = "saving" AND description = ?', (goal[1],))
-            progress = c.fetchone()[0] or 0.0
+            target_amount = Money(goal[2])
+            progress = Money(goal[6])
 
-            remaining = target_amount - progress
-            if remaining < 0:
-                remaining = 0.0
+            remaining = max(target_amount - progress, Money(0))
+            projected = None if goal[7] else GoalProgress.forecast(c, goal[0], goal[6], goal[2])
 
-            new_goal = (goal[0], goal[1], goal[2], goal[3], remaining, goal[4], goal[5])
+            new_goal = (goal[0], goal[1], target_amount, goal[3], remaining, goal[4], goal[5],
+                        progress, goal[7], goal[8], projected)
             goals.append(new_goal)
 
     return render_template('saving.html', goals=goals, total_saved=total_saved)
 
+@app.route('/goal-timeline/<int:goal_id>')
+def goal_timeline(goal_id): # Cumulative savings per day for one goal, for the timeline on the saving page.
+    return jsonify([{'date': date, 'saved': Money(saved).format(symbol=False)}
+                    for date, saved in GoalProgress.timeline(db_manager, goal_id)])
+
 @app.route('/add-goal', methods=['POST'])
 def add_goal():
     name = request.form['goal_name']
-    target = float(request.form['target'])
+    target = Money.parse(request.form['target'])
     goal = Goal(name, target)
     goal.save(db_manager)
     return redirect('/saving')
@@ -546,23 +1518,27 @@ def add_saving_expense():
             flash("Please enter a saving amount")
             return redirect('/saving')
         
-        amount = float(amount_str)
+        amount = Money.parse(amount_str)
         
-        if amount < 0:
-            flash(f"Saving amount cannot be negative: ${abs(amount):.2f}")
+        if amount.cents < 0:
+            flash(f"Saving amount cannot be negative: {abs(amount)}")
             return redirect('/saving')
-        elif amount == 0:
-            flash("Saving amount must be greater than $0.00")
+        elif amount.cents == 0:
+            flash(f"Saving amount must be greater than {Money(0, amount.currency)}")
             return redirect('/saving')
-        elif amount > 1000000:
-            flash("Saving amount is too large (maximum: $1,000,000)")
+        elif amount.cents > MAX_AMOUNT_CENTS:
+            flash(f"Saving amount is too large (maximum: {Money(MAX_AMOUNT_CENTS)})")
             return redirect('/saving')
             
     except ValueError:
         flash("Please enter a valid number for the saving amount")
         return redirect('/saving')
     
-    date_val = request.form['date']
+    try:
+        date_val = dt_date.fromisoformat(request.form['date']).isoformat()
+    except ValueError:
+        flash("Please enter a valid saving date (YYYY-MM-DD)")
+        return redirect('/saving')
     description = request.form.get('description', '')
     timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
@@ -572,18 +1548,20 @@ def add_saving_expense():
         active_goal = c.fetchone()
         goal_name = active_goal[0] if active_goal else 'No Active Goal'
 
-        c.execute('INSERT INTO Expenses (amount, date, description, category, timestamp) VALUES (?, ?, ?, ?, ?)',
-                  (amount, date_val, goal_name if description == '' else description, 'saving', timestamp))
+        c.execute('INSERT INTO Expenses (amount_cents, currency, date, description, category, timestamp) VALUES (?, ?, ?, ?, ?, ?)',
+                  (amount.cents, amount.currency, date_val, goal_name if description == '' else description, 'saving', timestamp))
+        GoalProgress.record_expenses(c, [c.lastrowid])
         conn.commit()
+    totals_cache.invalidate()
     
-    flash(f"Saving of ${amount:.2f} added successfully!")
+    flash(f"Saving of {amount} added successfully!")
     return redirect('/saving')
 
 @app.route('/update-goal/<int:goal_id>', methods=['POST'])
 def update_goal(goal_id):
     new_name = request.form['updated_name']
-    new_target = float(request.form['updated_target'])
-    goal = Goal('', 0)
+    new_target = Money.parse(request.form['updated_target'])
+    goal = Goal('', Money(0))
     goal.update(db_manager, goal_id, new_name, new_target)
     return redirect('/saving')
 
@@ -595,7 +1573,7 @@ def delete_goal(goal_id):
 
 @app.route('/update-income', methods=['POST'])
 def update_income():
-    income = float(request.form['income'])
+    income = Money.parse(request.form['income'])
     income_obj = Income(income)
     income_obj.update(db_manager)
     return redirect('/home')
@@ -605,73 +1583,54 @@ def edit_expense(expense_id):
     with db_manager.connect() as conn:
         c = conn.cursor()
     if request.method == 'POST':
+        currency = request.form.get('currency', app.config['BASE_CURRENCY']).strip().upper()
+        if currency not in ExchangeRate.currencies(db_manager):
+            flash(f"Unsupported currency: {currency}")
+            return redirect(f'/edit-expense/{expense_id}')
+
         try:
             amount_str = request.form['amount'].strip()
             if not amount_str:
                 flash("Please enter an expense amount")
                 return redirect(f'/edit-expense/{expense_id}')
             
-            amount = float(amount_str)
+            amount = Money.parse(amount_str, currency)
             
-            if amount < 0:
-                flash(f"Expense amount cannot be negative: ${abs(amount):.2f}")
+            if amount.cents < 0:
+                flash(f"Expense amount cannot be negative: {abs(amount)}")
                 return redirect(f'/edit-expense/{expense_id}')
-            elif amount == 0:
-                flash("Expense amount must be greater than $0.00")
+            elif amount.cents == 0:
+                flash(f"Expense amount must be greater than {Money(0, amount.currency)}")
                 return redirect(f'/edit-expense/{expense_id}')
-            elif amount > 1000000:
-                flash("Expense amount is too large (maximum: $1,000,000)")
+            elif ExchangeRate.to_base(db_manager, amount).cents > MAX_AMOUNT_CENTS:
+                # The limit applies to the converted amount, so large-unit currencies (VND, JPY, ...) aren't capped early
+                flash(f"Expense amount is too large (maximum: {Money(MAX_AMOUNT_CENTS)})")
                 return redirect(f'/edit-expense/{expense_id}')
                 
         except ValueError:
             flash("Please enter a valid number for the expense amount")
             return redirect(f'/edit-expense/{expense_id}')
         
-        date_val = request.form['date']
+        try:
+            date_val = dt_date.fromisoformat(request.form['date']).isoformat()
+        except ValueError:
+            flash("Please enter a valid expense date (YYYY-MM-DD)")
+            return redirect(f'/edit-expense/{expense_id}')
         description = request.form['description']
         category = request.form['category']
         expense = Expense(amount, date_val, description, category)
         expense.update(db_manager, expense_id)
-        flash(f"Expense updated successfully! New amount: ${amount:.2f}")
+        flash(f"Expense updated successfully! New amount: {amount}")
         return redirect('/summary')
     else:
-        c.execute('SELECT * FROM Expenses WHERE id=?', (expense_id,))
+        c.execute('SELECT id, amount_cents, date, description, category, timestamp, currency FROM Expenses WHERE id=?', (expense_id,))
         expense = c.fetchone()
 
-        categories = [
-            'Groceries', 'Transport', 'Entertainment', 'Utilities', 'Shopping', 'Health', 'Dining', 'Education',
-            'Travel', 'Personal Care', 'Insurance', 'Taxes', 'Gifts', 'Charity', 'Subscriptions', 'Home Improvement',
-            'Automotive', 'Childcare', 'Pet Care', 'Mortgage', 'Miscellaneous', 'Other', 'saving'
-        ]
-
-        keywords_map = {
-            "bus,uber,fuel,petrol,train,metro,taxi,bike": "Transport",
-            "grocery,aldi,coles,woolworths,supermarket,market": "Groceries",
-            "movie,cinema,netflix,spotify,concert,theater": "Entertainment",
-            "electricity,water,internet,phone,bill,gas": "Utilities",
-            "clothes,shopping,amazon,ebay,apparel": "Shopping",
-            "doctor,pharmacy,hospital,medicine,clinic": "Health",
-            "restaurant,cafe,coffee,food,dining,meal": "Dining",
-            "school,university,books,education,course": "Education",
-            "flight,hotel,airbnb,travel,tour,vacation": "Travel",
-            "haircut,spa,beauty,personal care": "Personal Care",
-            "insurance,health insurance,car insurance,home insurance": "Insurance",
-            "tax,taxes,income tax": "Taxes",
-            "gift,present,birthday,anniversary": "Gifts",
-            "charity,donation": "Charity",
-            "subscription,netflix,spotify,amazon prime": "Subscriptions",
-            "home improvement,repair,maintenance": "Home Improvement",
-            "car,automotive,auto,repair,fuel": "Automotive",
-            "childcare,baby,kids": "Childcare",
-            "pet,vet,pet care": "Pet Care",
-            "mortgage,home loan,property loan": "Mortgage",
-            "misc,other,miscellaneous": "Miscellaneous"
-        }
-
         return render_template(
             'add.html',
-            categories=categories,
-            keywords_to_categories=keywords_map,
+            categories=EXPENSE_CATEGORIES + ['saving'],
+            keywords_url=url_for('keywords_asset', version=KEYWORDS_ASSET.version),
+            currencies=ExchangeRate.currencies(db_manager),
             today=expense[2],
             edit_mode=True,
             expense=expense
@@ -686,6 +1645,9 @@ from flask import send_file
 from io import BytesIO
 from fpdf import FPDF
 
+def pdf_money(money): # The PDF core fonts are Latin-1 only, so amounts use currency codes rather than symbols.
+    return f"{money.currency} {money.format(symbol=False)}"
+
 @app.route('/export-report')
 def export_report():
     view_mode = request.args.get('view', 'monthly')
@@ -725,43 +1687,32 @@ def export_report():
                 query_period = datetime.now().strftime('%Y-%W')
                 selected_period_label = f"Week {int(query_period.split('-')[1])} {query_period.split('-')[0]}"
 
+        period_fmt = '%Y-%m' if view_mode == 'monthly' else '%Y-%W'
+        totals_key = (period_fmt, query_period, app.config['BASE_CURRENCY'])
+        totals, generation = totals_cache.get(totals_key, totals_cache.data_version(db_manager))
         try:
-            if view_mode == 'monthly':
-                c.execute('SELECT date, amount, category FROM Expenses WHERE strftime("%Y-%m", date) = ? ORDER BY date DESC', (query_period,))
-            else:
-                c.execute('SELECT date, amount, category FROM Expenses WHERE strftime("%Y-%W", date) = ? ORDER BY date DESC', (query_period,))
+            c.execute(f'SELECT date, amount_cents, category, currency FROM Expenses WHERE strftime("{period_fmt}", date) = ? ORDER BY date DESC', (query_period,))
             expenses = c.fetchall()
 
-            if view_mode == 'monthly':
-                c.execute('SELECT category, SUM(amount) FROM Expenses WHERE strftime("%Y-%m", date) = ? GROUP BY category', (query_period,))
-            else:
-                c.execute('SELECT category, SUM(amount) FROM Expenses WHERE strftime("%Y-%W", date) = ? GROUP BY category', (query_period,))
-            summary_data = c.fetchall()
-
-            if view_mode == 'monthly':
-                c.execute('SELECT SUM(amount) FROM Expenses WHERE strftime("%Y-%m", date) = ?', (query_period,))
-                total_spent = c.fetchone()[0] or 0
-                c.execute('SELECT SUM(amount) FROM Expenses WHERE category = "saving" AND strftime("%Y-%m", date) = ?', (query_period,))
-                total_saved = c.fetchone()[0] or 0
-            else:
-                c.execute('SELECT SUM(amount) FROM Expenses WHERE strftime("%Y-%W", date) = ?', (query_period,))
-                total_spent = c.fetchone()[0] or 0
-                c.execute('SELECT SUM(amount) FROM Expenses WHERE category = "saving" AND strftime("%Y-%W", date) = ?', (query_period,))
-                total_saved = c.fetchone()[0] or 0
+            if totals is None:
+                totals = period_totals_from_rows(db_manager.fetch_many(period_totals_queries(period_fmt, query_period), concurrent=False))
+                totals_cache.put(totals_key, totals, generation)
+            summary_data = totals['summary_data']
+            # The report's spending total includes money moved to savings
+            total_spent = totals['total_spent'] + totals['total_saved']
+            total_saved = totals['total_saved']
+            unconverted = totals['unconverted']
 
-            c.execute('SELECT target_amount FROM Goals WHERE is_active = 1')
+            c.execute('SELECT target_cents FROM Goals WHERE is_active = 1')
             goal = c.fetchone()
             saving_percent = 0
             if goal and goal[0] > 0:
-                saving_percent = int(round((total_saved / goal[0]) * 100))
+                saving_percent = int(round(total_saved.cents * 100 / goal[0]))
                 saving_percent = max(0, min(saving_percent, 100))
         except Exception as e:
+            # Fail the request rather than send a blank report that looks like a real one
             print(f"Error fetching export data: {e}")
-            expenses = []
-            summary_data = []
-            total_spent = 0
-            total_saved = 0
-            saving_percent = 0
+            raise
 
     pdf = FPDF()
     pdf.add_page()
@@ -780,7 +1731,7 @@ def export_report():
 
     for exp in expenses:
         pdf.cell(50, 8, exp[0], 1)
-        pdf.cell(40, 8, f"${exp[1]:.2f}", 1)
+        pdf.cell(40, 8, pdf_money(Money(exp[1], exp[3])), 1)
         pdf.cell(60, 8, exp[2], 1)
         pdf.ln()
 
@@ -795,16 +1746,18 @@ def export_report():
 
     for cat, tot in summary_data:
         pdf.cell(80, 8, cat, 1)
-        pdf.cell(40, 8, f"${tot:.2f}", 1)
+        pdf.cell(40, 8, pdf_money(Money(tot)), 1)
         pdf.ln()
 
     pdf.ln(10)
     pdf.set_font("Arial", "B", 12)
     pdf.cell(0, 10, "Totals:", ln=True)
     pdf.set_font("Arial", "", 10)
-    pdf.cell(0, 8, f"Total spent in this time period: ${total_spent:.2f}", ln=True)
-    pdf.cell(0, 8, f"Total saved in this time period: ${total_saved:.2f}", ln=True)
+    pdf.cell(0, 8, f"Total spent in this time period: {pdf_money(total_spent)}", ln=True)
+    pdf.cell(0, 8, f"Total saved in this time period: {pdf_money(total_saved)}", ln=True)
     pdf.cell(0, 8, f"Saving Goal Progress: {saving_percent}%", ln=True)
+    if unconverted:
+        pdf.cell(0, 8, f"{unconverted} expense(s) without an exchange rate are left out of these totals.", ln=True)
 
     pdf_output = BytesIO()
     pdf_output_str = pdf.output(dest='S').encode('latin1')
@@ -816,4 +1769,5 @@ def export_report():
 if __name__ == '__main__':
     if not os.path.exists(DB_NAME):
         db_manager.init_db()
+    precompile_templates()
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,235 @@
+"""Replay a mix of SmartSpend traffic from many threads and processes and report how it scales.
+
+Usage:
+    python loadtest.py --spawn
+    python loadtest.py --url http://127.0.0.1:5000 --concurrency 1,4,16,64 --duration 20
+
+Each concurrency level runs for --duration seconds with the requested number of client threads,
+spread over --processes worker processes, each picking routes from the weighted --mix. The report
+gives per-route throughput, latency percentiles, error rates and SQLite lock errors, followed by
+a saturation curve across all levels.
+
+Lock errors and database time come from the X-DB-Busy / X-DB-Time-Ms headers the app adds when
+started with SMARTSPEND_DB_STATS=1. --spawn does this for you. It serves a scratch copy of
+smartspend.db on a free port, so the write routes never touch the real database.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from datetime import date
+from multiprocessing import Pool
+
+DEFAULT_MIX = 'home=30,summary=20,saving=15,save-expense=20,add-saving-expense=10,export-report=5'
+CATEGORIES = ['Groceries', 'Transport', 'Dining', 'Utilities', 'Entertainment']
+
+
+def build_request(route): # Returns (method, path, form data) for one request to the named route.
+    if route == 'save-expense':
+        return 'POST', '/save-expense', {
+            'amount': f"{random.uniform(1, 200):.2f}",
+            'date': date.today().isoformat(),
+            'description': 'load test',
+            'category': random.choice(CATEGORIES),
+        }
+    if route == 'add-saving-expense':
+        return 'POST', '/add-saving-expense', {'amount': f"{random.uniform(1, 50):.2f}", 'date': date.today().isoformat()}
+    if route == 'summary':
+        return 'GET', '/summary?view=' + random.choice(['monthly', 'weekly']), None
+    return 'GET', '/' + route, None
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler): # Measures the POST itself, not the page it redirects to.
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        route, _, weight = part.partition('=')
+        mix[route.strip()] = float(weight or 1)
+    return mix
+
+
+def run_clients(job):
+    """Run job['threads'] client threads until the deadline and return their samples.
+
+    A sample is (route, status, latency_ms, db_ms, busy); status 0 means the request never
+    got an HTTP response (connection refused, timeout, ...).
+    """
+    opener = urllib.request.build_opener(NoRedirect)
+    routes, weights = zip(*job['mix'].items())
+    samples = []
+    lock = threading.Lock()
+
+    def client():
+        local = []
+        while time.time() < job['deadline']:
+            route = random.choices(routes, weights)[0]
+            method, path, form = build_request(route)
+            data = urllib.parse.urlencode(form).encode() if form else None
+            req = urllib.request.Request(job['url'] + path, data=data, method=method)
+            started = time.perf_counter()
+            try:
+                with opener.open(req, timeout=job['timeout']) as response:
+                    response.read()
+                    status, headers = response.status, response.headers
+            except urllib.error.HTTPError as e:
+                e.read()
+                status, headers = e.code, e.headers
+            except (urllib.error.URLError, OSError):
+                status, headers = 0, {}
+            latency_ms = (time.perf_counter() - started) * 1000
+            local.append((route, status, latency_ms,
+                          float(headers.get('X-DB-Time-Ms') or 0), int(headers.get('X-DB-Busy') or 0)))
+        with lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=client) for _ in range(job['threads'])]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(samples, elapsed):
+    """Per-route and overall statistics for one concurrency level"""
+    by_route = defaultdict(list)
+    for sample in samples:
+        by_route[sample[0]].append(sample)
+    by_route['ALL'] = samples
+    stats = {}
+    for route, rows in by_route.items():
+        latencies = sorted(row[2] for row in rows)
+        errors = sum(1 for row in rows if row[1] == 0 or row[1] >= 400)
+        stats[route] = {
+            'requests': len(rows),
+            'rps': len(rows) / elapsed if elapsed else 0.0,
+            'p50_ms': percentile(latencies, 50),
+            'p95_ms': percentile(latencies, 95),
+            'p99_ms': percentile(latencies, 99),
+            'max_ms': latencies[-1] if latencies else 0.0,
+            'error_rate': errors / len(rows) if rows else 0.0,
+            'busy': sum(row[4] for row in rows),
+            'db_ms_avg': sum(row[3] for row in rows) / len(rows) if rows else 0.0,
+        }
+    return stats
+
+
+def print_level(concurrency, stats):
+    print(f"\n== {concurrency} concurrent clients ==")
+    print(f"{'route':<20}{'reqs':>7}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}{'err%':>7}{'busy':>6}{'db ms':>8}")
+    for route in sorted(stats, key=lambda r: (r == 'ALL', r)):
+        s = stats[route]
+        print(f"{route:<20}{s['requests']:>7}{s['rps']:>9.1f}{s['p50_ms']:>9.1f}{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}"
+              f"{s['max_ms']:>9.1f}{s['error_rate'] * 100:>7.1f}{s['busy']:>6}{s['db_ms_avg']:>8.1f}")
+
+
+def print_curve(levels):
+    print("\n== Saturation curve ==")
+    print(f"{'clients':>8}{'req/s':>9}{'p50':>9}{'p99':>9}{'err%':>7}{'busy':>6}")
+    for concurrency, stats in levels:
+        s = stats['ALL']
+        print(f"{concurrency:>8}{s['rps']:>9.1f}{s['p50_ms']:>9.1f}{s['p99_ms']:>9.1f}{s['error_rate'] * 100:>7.1f}{s['busy']:>6}")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def spawn_server(threaded=True):
+    """Start the app on a scratch copy of the database and return (process, base URL, workdir)"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    workdir = tempfile.mkdtemp(prefix='smartspend-load-')
+    shutil.copy(os.path.join(here, 'app.py'), workdir)
+    shutil.copytree(os.path.join(here, 'templates'), os.path.join(workdir, 'templates'))
+    shutil.copytree(os.path.join(here, 'static'), os.path.join(workdir, 'static'))
+    if os.path.exists(os.path.join(here, 'smartspend.db')):
+        shutil.copy(os.path.join(here, 'smartspend.db'), workdir)
+    port = free_port()
+    env = dict(os.environ, SMARTSPEND_DB_STATS='1')
+    command = [sys.executable, '-m', 'flask', '--app', 'app', 'run', '--port', str(port),
+               '--with-threads' if threaded else '--without-threads']
+    process = subprocess.Popen(command, cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(url + '/login', timeout=1).read()
+            return process, url, workdir
+        except OSError:
+            if process.poll() is not None:
+                break
+            time.sleep(0.1)
+    process.terminate()
+    raise SystemExit(f"App did not start on {url}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='base URL of a running instance')
+    parser.add_argument('--spawn', action='store_true', help='start a local instance on a scratch copy of the database')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'weighted route mix (default: {DEFAULT_MIX})')
+    parser.add_argument('--concurrency', default='1,2,4,8,16,32', help='comma-separated client counts to step through')
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1, help='client processes per level')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per concurrency level')
+    parser.add_argument('--timeout', type=float, default=30.0, help='per-request timeout in seconds')
+    parser.add_argument('--json', help='also write the raw statistics to this file')
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    process = workdir = None
+    url = args.url.rstrip('/')
+    if args.spawn:
+        process, url, workdir = spawn_server()
+        print(f"Serving a scratch copy of the database from {workdir} at {url}")
+
+    levels = []
+    try:
+        with Pool(args.processes) as pool:
+            for concurrency in (int(c) for c in args.concurrency.split(',')):
+                workers = min(args.processes, concurrency)
+                deadline = time.time() + args.duration
+                jobs = [{'url': url, 'mix': mix, 'deadline': deadline, 'timeout': args.timeout,
+                         'threads': concurrency // workers + (1 if i < concurrency % workers else 0)}
+                        for i in range(workers)]
+                started = time.time()
+                samples = [sample for batch in pool.map(run_clients, jobs) for sample in batch]
+                stats = summarize(samples, time.time() - started)
+                print_level(concurrency, stats)
+                levels.append((concurrency, stats))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print_curve(levels)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump([{'concurrency': c, 'routes': s} for c, s in levels], f, indent=2)
+
+
+if __name__ == '__main__':
+    main()